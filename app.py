@@ -20,7 +20,9 @@ db = client.cms_api
 import server.player_crud
 import server.team_crud
 import server.oauth2
+import server.change_crud
 
 app.include_router(server.player_crud.router)
 app.include_router(server.team_crud.router)
-app.include_router(server.oauth2.router)
\ No newline at end of file
+app.include_router(server.oauth2.router)
+app.include_router(server.change_crud.router)
\ No newline at end of file
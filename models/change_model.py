@@ -0,0 +1,42 @@
+from pydantic import BaseModel, Field
+from typing import List
+from datetime import datetime
+from enum import Enum
+from models.misc_models import PyObjectId
+from bson import ObjectId
+
+
+class ChangeCollection(str, Enum):
+    players = "players"
+    teams = "teams"
+    users = "users"
+
+
+class ChangeOperation(str, Enum):
+    upsert = "upsert"
+    delete = "delete"
+
+
+class ChangeBase(BaseModel):
+    seq: int
+    collection: ChangeCollection
+    document_id: str
+    operation: ChangeOperation
+    version: int = None  # Version of the document this entry reflects
+    document: dict = None  # Snapshot after the write, None for deletes (tombstones)
+
+    class Config:
+        allow_population_by_field_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
+
+
+class Change(ChangeBase):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ChangePage(BaseModel):
+    changes: List[Change] = []
+    cursor: int  # Pass as `since` on the next request
+    has_more: bool = False
@@ -27,4 +27,5 @@ class Player(PlayerBase):
     mc_username: str
     mc_uuid: str
     badges: List[str] = []
+    version: int = 0  # Incremented on every write, see the changes API
     
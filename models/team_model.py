@@ -33,4 +33,5 @@ class Team(TeamBase):
     is_active: bool = True
     managers: List[str] = []  # User IDs
     players: List[str] = []  # Player IDs
-    badges: List[str] = []  # Badge IDs
\ No newline at end of file
+    badges: List[str] = []  # Badge IDs
+    version: int = 0  # Incremented on every write, see the changes API
\ No newline at end of file
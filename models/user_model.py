@@ -21,6 +21,7 @@ class User(UserBase):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     is_admin: bool = False
     player: str = None
+    version: int = 0  # Incremented on every write, see the changes API
 
 
 class UserInDB(User):
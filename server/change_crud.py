@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+from typing import Optional
+
+from models import change_model, misc_models, user_model
+from .oauth2 import get_current_user
+from .change_log import read_changes
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["changes"]
+)
+
+MAX_PAGE_SIZE = 1000
+
+
+@router.get(
+    "/",
+    response_description="List changes made after a cursor",
+    response_model=change_model.ChangePage,
+    responses={
+        401: {
+            "model": misc_models.Message,
+            "description": "Raised if a user who is not an admin requests changes to users"
+        }
+    }
+)
+async def get_changes(
+    since: int = 0,
+    collection: Optional[change_model.ChangeCollection] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    current_user: user_model.User = Depends(get_current_user)
+):
+    """
+    Returns changes with a sequence number greater than `since`, oldest first
+
+    Start with `since=0` and then pass back the `cursor` from each response. Keep requesting
+    while `has_more` is true. Players, teams and users which existed before the change log
+    was introduced are included as `upsert` entries, so no separate full download is needed.
+
+    Every `upsert` carries the document's `version`. Concurrent writes to the same document
+    can be logged out of order, so only apply an upsert if its version is greater than the
+    one you already hold. Deleted documents are returned as entries with a `delete` operation
+    and no `document`. IDs are never reused, so a delete is final for that ID.
+
+    `cursor` never moves past a write that is still in progress, so changes which are being
+    written when you request a page are returned by a later request.
+
+    Optionally provide `collection` (`players`, `teams` or `users`) to only receive changes
+    for that collection. Changes to users are only returned to admins
+    """
+    if collection == change_model.ChangeCollection.users and not current_user.is_admin:
+        return JSONResponse(
+            status_code=401,
+            content={
+                "message": f"You do not have admin permissions which are required to view changes to users"}
+        )
+
+    if collection is not None:
+        collections = [collection.value]
+    elif current_user.is_admin:
+        collections = [c.value for c in change_model.ChangeCollection]
+    else:
+        collections = [c.value for c in change_model.ChangeCollection if c != change_model.ChangeCollection.users]
+
+    changes, cursor, has_more = await read_changes(since, collections, limit)
+    return {"changes": changes, "cursor": cursor, "has_more": has_more}
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument, ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app import app, db
+
+from models import change_model, user_model
+
+logger = logging.getLogger(__name__)
+
+# How long a write may stay pending before the settle task assumes its writer died
+PENDING_TIMEOUT_MS = 30000
+SETTLE_INTERVAL_SECONDS = 10
+
+LOGGED_COLLECTIONS = [c.value for c in change_model.ChangeCollection]
+
+# Keep references to the background tasks so they are not garbage collected
+background_tasks = []
+
+
+@app.on_event("startup")
+async def setup_change_log():
+    # Sync queries are range scans on seq, optionally within one collection
+    await db["changes"].create_index([("seq", ASCENDING)], unique=True)
+    await db["changes"].create_index([("collection", ASCENDING), ("seq", ASCENDING)])
+    await db["pending_changes"].create_index([("seq_floor", ASCENDING)])
+    background_tasks.append(asyncio.create_task(backfill_change_log()))
+    background_tasks.append(asyncio.create_task(settle_abandoned_changes()))
+
+
+async def backfill_change_log():
+    """
+    Log every document which existed before the change log did, so mirrors syncing
+    from `since=0` receive them
+
+    Only one instance runs the backfill, the `changes_backfill` counter acts as a lock.
+    If that instance dies part way through, unset `running` on it to let the backfill
+    run again. The duplicate upserts this produces are ignored by mirrors thanks to
+    the document version
+    """
+    try:
+        await db["counters"].find_one_and_update(
+            {"_id": "changes_backfill", "done": {"$exists": False}, "running": {"$ne": True}},
+            {"$set": {"running": True}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Already done, or running on another instance
+        return
+    try:
+        for collection in LOGGED_COLLECTIONS:
+            async for document in db[collection].find():
+                pending = await begin_change(collection, document["_id"], change_model.ChangeOperation.upsert)
+                await finish_change(pending, change_model.ChangeOperation.upsert, document)
+        await db["counters"].update_one(
+            {"_id": "changes_backfill"},
+            {"$set": {"done": True, "running": False}}
+        )
+    except Exception:
+        logger.exception("Change log backfill failed")
+
+
+async def next_seq():
+    counter = await db["counters"].find_one_and_update(
+        {"_id": "changes"},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"]
+
+
+async def current_seq():
+    counter = await db["counters"].find_one({"_id": "changes"})
+    return counter["seq"] if counter else 0
+
+
+def public_snapshot(collection: str, document: dict):
+    if collection == change_model.ChangeCollection.users:
+        # Never let the password hash into the change log
+        return jsonable_encoder(user_model.User(**document))
+    return document
+
+
+async def begin_change(collection: str, document_id: str, operation: change_model.ChangeOperation):
+    """
+    Record that a write is in progress before it happens
+
+    The seq its entry will get is at least `seq_floor`, so readers hold back everything
+    from the oldest pending `seq_floor` onwards. `started_at` is set from the database
+    clock so every instance agrees on when a pending write has timed out
+    """
+    pending = {
+        "_id": str(ObjectId()),
+        "collection": collection,
+        "document_id": document_id,
+        "operation": operation.value,
+        "seq_floor": await current_seq() + 1
+    }
+    await db["pending_changes"].update_one(
+        {"_id": pending["_id"]},
+        {"$set": pending, "$currentDate": {"started_at": True}},
+        upsert=True
+    )
+    return pending
+
+
+async def append_change(
+    collection: str,
+    document_id: str,
+    operation: change_model.ChangeOperation,
+    document: dict = None,
+    version: int = None
+):
+    if document is not None:
+        version = document.get("version", 0)
+        document = public_snapshot(collection, document)
+    change_obj = change_model.Change(
+        seq=await next_seq(),
+        collection=collection,
+        document_id=document_id,
+        operation=operation,
+        version=version,
+        document=document
+    )
+    await db["changes"].insert_one(jsonable_encoder(change_obj))
+
+
+async def finish_change(
+    pending: dict,
+    operation: change_model.ChangeOperation = None,
+    document: dict = None,
+    version: int = None
+):
+    """
+    Log the result of a pending write, or nothing if `operation` is None because the
+    write did not match a document
+
+    Failures are only logged: the write has already happened, and the settle task logs
+    it from the document's state once the pending write times out
+    """
+    try:
+        if operation is not None:
+            await append_change(pending["collection"], pending["document_id"], operation, document, version)
+        await db["pending_changes"].delete_one({"_id": pending["_id"]})
+    except Exception:
+        logger.exception(f"Could not log change to {pending['document_id']}, it will be settled once it times out")
+
+
+async def settle_change(pending: dict):
+    """
+    Log a pending write whose outcome is unknown by reading back the document
+
+    If the writer is in fact still running it logs its own result afterwards, so the
+    newest entry always matches the document
+    """
+    collection = pending["collection"]
+    document = await db[collection].find_one({"_id": pending["document_id"]})
+    if document is not None:
+        await append_change(collection, pending["document_id"], change_model.ChangeOperation.upsert, document)
+    elif pending["operation"] == change_model.ChangeOperation.delete:
+        await append_change(collection, pending["document_id"], change_model.ChangeOperation.delete)
+    # A missing document after an insert or update means the write did not happen, or the
+    # document was deleted by another write which logs its own tombstone
+    await db["pending_changes"].delete_one({"_id": pending["_id"]})
+
+
+async def settle_failed_change(pending: dict):
+    try:
+        await settle_change(pending)
+    except Exception:
+        logger.exception(f"Could not settle failed change to {pending['document_id']}")
+
+
+async def settle_abandoned_changes():
+    """Periodically settle pending writes whose writer died before logging them"""
+    while True:
+        await asyncio.sleep(SETTLE_INTERVAL_SECONDS)
+        try:
+            while True:
+                # Claim the write by restarting its clock, so other instances leave it alone
+                pending = await db["pending_changes"].find_one_and_update(
+                    {"$expr": {"$lt": ["$started_at", {"$subtract": ["$$NOW", PENDING_TIMEOUT_MS]}]}},
+                    {"$currentDate": {"started_at": True}}
+                )
+                if pending is None:
+                    break
+                await settle_change(pending)
+        except Exception:
+            logger.exception("Could not settle abandoned changes")
+
+
+async def logged_insert(collection: str, document: dict):
+    document = {**document, "version": 1}
+    pending = await begin_change(collection, document["_id"], change_model.ChangeOperation.upsert)
+    try:
+        await db[collection].insert_one(document)
+    except BaseException:
+        await settle_failed_change(pending)
+        raise
+    await finish_change(pending, change_model.ChangeOperation.upsert, document)
+    return document
+
+
+async def logged_update(collection: str, document_id: str, fields: dict):
+    """
+    Apply `fields` to a document and log the result
+
+    The version is bumped in the same atomic operation which returns the snapshot, so
+    mirrors can tell which of two concurrent entries for a document is newer
+    """
+    pending = await begin_change(collection, document_id, change_model.ChangeOperation.upsert)
+    try:
+        updated_document = await db[collection].find_one_and_update(
+            {"_id": document_id},
+            {"$set": fields, "$inc": {"version": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+    except BaseException:
+        await settle_failed_change(pending)
+        raise
+    if updated_document is not None:
+        await finish_change(pending, change_model.ChangeOperation.upsert, updated_document)
+    else:
+        await finish_change(pending)
+    return updated_document
+
+
+async def logged_delete(collection: str, document_id: str):
+    pending = await begin_change(collection, document_id, change_model.ChangeOperation.delete)
+    try:
+        deleted_document = await db[collection].find_one_and_delete({"_id": document_id})
+    except BaseException:
+        await settle_failed_change(pending)
+        raise
+    if deleted_document is not None:
+        await finish_change(
+            pending,
+            change_model.ChangeOperation.delete,
+            version=deleted_document.get("version", 0) + 1
+        )
+    else:
+        await finish_change(pending)
+    return deleted_document
+
+
+async def read_changes(since: int, collections: list, limit: int):
+    """
+    Read up to `limit` entries for `collections` after `since`, oldest first
+
+    Only entries below the horizon are returned: everything below it has been logged,
+    while pending writes may still log entries at or above the oldest `seq_floor`.
+    Returns the entries, the cursor to continue from and whether there are more
+    """
+    # The head must be read before the pending writes: a write which begins after that
+    # read can only get a seq above the head
+    horizon = await current_seq() + 1
+    oldest_pending = await db["pending_changes"].find_one({}, sort=[("seq_floor", ASCENDING)])
+    if oldest_pending is not None:
+        horizon = min(horizon, oldest_pending["seq_floor"])
+
+    query = {"seq": {"$gt": since, "$lt": horizon}, "collection": {"$in": collections}}
+    # Fetch one extra entry to find out if there is another page
+    entries = await db["changes"].find(query).sort("seq", ASCENDING).limit(limit + 1).to_list(None)
+    if len(entries) > limit:
+        entries = entries[:limit]
+        return entries, entries[-1]["seq"], True
+    # Nothing else below the horizon concerns this reader, so skip straight to it
+    return entries, max(since, horizon - 1), False
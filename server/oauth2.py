@@ -10,6 +10,7 @@ from passlib.context import CryptContext
 from pydantic import BaseModel
 
 from app import app, db, config
+from .change_log import logged_insert
 
 
 
@@ -139,6 +140,5 @@ async def create_user(
         username=new_user_data.username,
         hashed_password=get_password_hash(new_user_data.password)
     )
-    new_user = await db["users"].insert_one(jsonable_encoder(user_obj))
-    created_user = await db["users"].find_one({"_id": new_user.inserted_id})
+    created_user = await logged_insert("users", jsonable_encoder(user_obj))
     return created_user
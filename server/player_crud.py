@@ -8,6 +8,7 @@ from app import db
 
 from models import player_model, misc_models, team_model, user_model
 from .oauth2 import get_current_user
+from .change_log import logged_insert, logged_update, logged_delete
 
 router = APIRouter(
     prefix="/players",
@@ -61,8 +62,7 @@ async def add_player(
         mc_uuid=uuid,
         mc_username=player.mc_username
     )
-    new_player = await db["players"].insert_one(jsonable_encoder(player_with_uuid))
-    created_player = await db["players"].find_one({"_id": new_player.inserted_id})
+    created_player = await logged_insert("players", jsonable_encoder(player_with_uuid))
     return created_player
 
 
@@ -109,9 +109,9 @@ async def get_player_by_username(mc_username: str):
     }
 )
 async def delete_player(player_id: str, current_user: user_model.User = Depends(get_current_user)):
-    delete_result = await db["players"].delete_one({"_id": player_id})
+    deleted_player = await logged_delete("players", player_id)
 
-    if delete_result.deleted_count == 1:
+    if deleted_player is not None:
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
     return JSONResponse(status_code=404, content={"message": f"Could not find player with ID {player_id}"})
@@ -178,12 +178,9 @@ async def update_player(
                         "message": f"Could not find minecraft account with UUID {player['mc_uuid']}"
                     }
                 )
-        update_result = await db["players"].update_one({"_id": player_id}, {"$set": player})
-
-        if update_result.modified_count == 1:
-            updated_player = await db["players"].find_one({"_id": player_id})
-            if updated_player is not None:
-                return updated_player
+        updated_player = await logged_update("players", player_id, player)
+        if updated_player is not None:
+            return updated_player
 
     existing_player = await db["players"].find_one({"_id": player_id})
     if existing_player is not None:
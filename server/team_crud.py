@@ -7,6 +7,7 @@ from app import db
 
 from models import team_model, misc_models, player_model, user_model
 from .oauth2 import get_current_user
+from .change_log import logged_insert, logged_update, logged_delete
 
 router = APIRouter(
     prefix="/teams",
@@ -46,8 +47,7 @@ async def add_team(
                 "message": f"Team {existing_team['name']} with alias {existing_team['alias']} already exists"}
         )
     team_obj = team_model.Team(**team.dict())
-    new_team = await db["teams"].insert_one(jsonable_encoder(team_obj))
-    created_team = await db["teams"].find_one({"_id": new_team.inserted_id})
+    created_team = await logged_insert("teams", jsonable_encoder(team_obj))
     return created_team
 
 
@@ -100,9 +100,9 @@ async def get_team_by_alias(team_alias: str):
     }
 )
 async def delete_team(team_id: str, current_user: user_model.User = Depends(get_current_user)):
-    delete_result = await db["teams"].delete_one({"_id": team_id})
+    deleted_team = await logged_delete("teams", team_id)
 
-    if delete_result.deleted_count == 1:
+    if deleted_team is not None:
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
     return JSONResponse(status_code=404, content={"message": f"Could not find team with ID {team_id}"})
@@ -120,12 +120,9 @@ async def update_team(
     team = {k: v for k, v in team.dict().items() if v is not None}
 
     if len(team) >= 1:
-        update_result = await db["teams"].update_one({"_id": team_id}, {"$set": team})
-
-        if update_result.modified_count == 1:
-            updated_team = await db["teams"].find_one({"_id": team_id})
-            if updated_team is not None:
-                return updated_team
+        updated_team = await logged_update("teams", team_id, team)
+        if updated_team is not None:
+            return updated_team
 
     existing_team = await db["teams"].find_one({"_id": team_id})
     if existing_team is not None: